@@ -20,6 +20,7 @@ This file is part of the PTYPY package.
 import numpy as np
 import os
 import h5py
+import concurrent.futures
 from . import geometry
 from . import xy
 from .. import utils as u
@@ -249,10 +250,15 @@ class PtyScan(object):
 
         Call :py:data:`initialize` to begin loading and data file creation.
         """
-        # Load default parameter structure
-        p = self.DEFAULT.copy(99)
+        # Load default parameter structure. Subclasses usually pass a
+        # complete copy of their defaults, so only the subtrees that are
+        # not replaced by the input are copied from the shared template.
+        p = self.DEFAULT.copy()
         p.update(pars)
         p.update(kwargs)
+        for k, v in self.DEFAULT.items():
+            if p[k] is v and isinstance(v, u.Param):
+                p[k] = v.copy(99)
 
         # Attempt to get number of frames.
         self.num_frames = p.num_frames
@@ -639,8 +645,15 @@ class PtyScan(object):
         indices.lm = parallel.loadmanager.assign(indices.chunk)
         # This one contains now a list of indices listed after rank
 
-        # Index list (node specific)
-        indices.node = [indices.chunk[k] for k in indices.lm[parallel.rank]]
+        # Index list (node specific). The loadmanager hands out contiguous
+        # blocks, which an O(1) check confirms before slicing.
+        lm = indices.lm[parallel.rank]
+        if not lm:
+            indices.node = []
+        elif lm[-1] - lm[0] + 1 == len(lm):
+            indices.node = indices.chunk[lm[0]:lm[-1] + 1]
+        else:
+            indices.node = [indices.chunk[k] for k in lm]
 
         # Store internally
         self.indices = indices
@@ -685,11 +698,12 @@ class PtyScan(object):
             # Peak at first item
             if self.has_weight2d:
                 altweight = self.weight2d
+            elif 'weight2d' in self.info:
+                altweight = self.info.weight2d
             else:
-                try:
-                    altweight = self.info.weight2d
-                except:
-                    altweight = np.ones(dsh)
+                # Read-only, zero-copy placeholder. Frames are stacked
+                # (copied) before any processing.
+                altweight = np.broadcast_to(1., tuple(dsh))
             weights = dict.fromkeys(data.keys(), altweight)
 
         assert len(weights) == len(data), (
@@ -765,12 +779,16 @@ class PtyScan(object):
 
             # We proceed with numpy arrays.That is probably now more memory
             # intensive but shorter in writing
+            # A weight shared by all frames is only processed once
             if has_data:
-                d = np.array([data[ind] for ind in indices.node])
-                w = np.array([weights[ind] for ind in indices.node])
+                d = np.stack([data[ind] for ind in indices.node])
+                wl = [weights[ind] for ind in indices.node]
+                shared_weight = all(x is wl[0] for x in wl)
+                w = np.stack(wl[:1] if shared_weight else wl)
             else:
                 d = np.ones((1,) + tuple(dsh))
                 w = np.ones((1,) + tuple(dsh))
+                shared_weight = False
 
             # Crop data
             d, tmp = u.crop_pad_symmetric_2d(d, sh, cen)
@@ -821,7 +839,10 @@ class PtyScan(object):
             if has_data:
                 # Translate back to dictionaries
                 data = dict(zip(indices.node, d))
-                weights = dict(zip(indices.node, w))
+                if shared_weight:
+                    weights = dict.fromkeys(indices.node, w[0])
+                else:
+                    weights = dict(zip(indices.node, w))
 
         # Adapt geometric info
         self.meta.center = cen / float(self.rebin)
@@ -851,16 +872,15 @@ class PtyScan(object):
         # Slice positions from common if they are empty too
         if positions is None or len(positions) == 0:
             pt = self.info.positions_theory
+            ps = self.info.get('positions_scan')
             if pt is not None:
                 chunk.positions = pt[indices.chunk]
+            elif ps is not None and indices.chunk[-1] < len(ps):
+                chunk.positions = ps[indices.chunk]
             else:
-                try:
-                    chunk.positions = (
-                        self.info.positions_scan[indices.chunk])
-                except:
-                    logger.info('Unable to slice position information from '
-                                'experimental or theoretical resource.')
-                    chunk.positions = [None] * len(indices.chunk)
+                logger.info('Unable to slice position information from '
+                            'experimental or theoretical resource.')
+                chunk.positions = [None] * len(indices.chunk)
         else:
             # A dict : sort positions to indices.chunk
             # This may fail if there are less positions than scan points
@@ -921,6 +941,15 @@ class PtyScan(object):
     def _make_data_package(self, chunk):
         """
         Returns the loaded data chunk `chunk` as a data package.
+
+        Note
+        ----
+        The frames and positions of the "iterable" part are views into
+        the stacked arrays of `chunk`, not copies, and masks may be shared
+        between frames or be read-only broadcasts. Holding on to a single
+        frame therefore keeps the whole chunk alive; consumers that keep
+        frames beyond the package (rather than copying them into
+        storages) should ``copy()`` them.
         """
 
         # The "common" part
@@ -929,28 +958,44 @@ class PtyScan(object):
         # The "raw" part. Might replace the iterable in future.
         out['chunk'] = chunk
         
+        # Fallback weight for frames without one in the chunk
+        fallback = getattr(self, 'weight2d', None)
+
+        # Frames frequently share the same 2d weight, in which case the
+        # mask is computed once and shared as well. The weights are kept
+        # alive by the chunk, so their ids are unique during the loop.
+        masks = {}
+
+        # Bound once, as attribute access on a Param is costly per frame
+        data_get = chunk.data.get
+        weights_get = chunk.weights.get
+
         # The "iterable" part
         iterables = []
         for pos, index in zip(chunk.positions, chunk.indices):
-            frame = {'index': index,
-                     'data': chunk.data.get(index),
-                     'position': pos}
+            data = data_get(index)
 
-            if frame['data'] is None:
-                frame['mask'] = None
+            if data is None:
+                mask = None
             else:
                 # Ok, we now know that we need a mask since data is not None
                 # First look in chunk for a weight to this index, then
                 # look for a 2d-weight in meta, then arbitrarily set
                 # weight to ones.
-                try:
-                    fallback = self.weight2d
-                except AttributeError:
-                    fallback = np.ones_like(frame['data'])
-                w = chunk.weights.get(index, fallback)
-                frame['mask'] = (w > 0)
+                w = weights_get(index, fallback)
+                if w is None:
+                    # Read-only view, consumers copy it into their buffers
+                    mask = np.broadcast_to(True, data.shape)
+                else:
+                    mask = masks.get(id(w))
+                    if mask is None:
+                        mask = masks[id(w)] = (w > 0)
 
-            iterables.append(frame)
+            # Each frame is built in one go once its mask is known
+            iterables.append({'index': index,
+                              'data': data,
+                              'position': pos,
+                              'mask': mask})
 
         out['iterable'] = iterables
 
@@ -1192,10 +1237,14 @@ class PtyScan(object):
                 else:
                     v = dict(zip(ind, np.asarray(c[k])))
 
-                parallel.barrier()
-                # Gather the content
-                newv = parallel.gather_dict(v)
-                todisk[k] = np.asarray([newv[j] for j in sorted(newv.keys())])
+                # Gather the content with one collective. Frames are
+                # stacked per node and reordered by index if needed
+                keys = sorted(v.keys())
+                order = parallel.gather_array(np.asarray(keys, dtype=int))
+                newv = parallel.gather_array(np.asarray([v[j] for j in keys]))
+                if parallel.master and (np.diff(order) < 0).any():
+                    newv = newv[np.argsort(order)]
+                todisk[k] = newv
 
         parallel.barrier()
 
@@ -1247,6 +1296,53 @@ class PtydScan(PtyScan):
     help = Alternate source file path if data is meant to be reprocessed.
     doc = `None` for input shall be deprecated in future
 
+    [prefetch]
+    default = False
+    type = bool
+    help = Read ahead the next frames in a background thread
+    doc = If ``True``, the frames following those just loaded are read from the source in
+      a background thread while the current ones are processed. The source is held open
+      during that read. Not used for collective MPI-IO reads.
+    userlevel = 2
+
+    [load_dtype]
+    default = None
+    type = str, None
+    help = Data type of the diffraction frames as they are read from the source
+    doc = If set (e.g. ``'float32'``), frames are converted by HDF5 while they are read
+      into memory, without an intermediate copy in the stored type. ``None`` keeps the
+      stored type. Weights and positions are not affected.
+    userlevel = 2
+
+    [mpiio]
+    default =
+    type = Param
+    help = MPI-IO hints for collective reads
+    doc = Only used if h5py is built against a parallel HDF5 and all nodes load data.
+      Tune per filesystem; see the ROMIO documentation.
+    userlevel = 2
+
+    [mpiio.romio_cb_read]
+    default = 'enable'
+    type = str
+    help = Collective buffering (two-phase I/O) for reads
+    choices = ['enable', 'disable', 'automatic']
+    userlevel = 2
+
+    [mpiio.cb_buffer_size]
+    default = 16777216
+    type = int
+    help = Size in bytes of the collective buffer of each aggregator
+    lowlim = 1
+    userlevel = 2
+
+    [mpiio.romio_ds_read]
+    default = 'disable'
+    type = str
+    help = Data sieving for independent reads
+    choices = ['enable', 'disable', 'automatic']
+    userlevel = 2
+
     """
 
     def __init__(self, pars=None, **kwargs):
@@ -1292,20 +1388,37 @@ class PtydScan(PtyScan):
 
         self.source = source
 
-        # At least ONE chunk must exist to ensure everything works
-        with h5py.File(source, 'r') as f:
-            check = f.get('chunks/0')
-            f.close()
-            # Get number of frames supposedly in the file
-            # FIXME: try/except clause only for backward compatibilty
-            # for .ptyd files created priot to commit 2e626ff
-            #try:
-            #    source_frames = f.get('info/num_frames_actual')[...].item()
-            #except TypeError:
-            #    source_frames = len(f.get('info/positions_scan')[...])
-            #f.close()
-
-        if check is None:
+        # At least ONE chunk must exist to ensure everything works.
+        # Only the master inspects the source and reads the meta
+        # information, which is then shared with the other processes.
+        check, meta, error = None, None, None
+        if parallel.master:
+            try:
+                with h5py.File(source, 'r') as f:
+                    check = f.get('chunks/0') is not None
+                    # Get number of frames supposedly in the file
+                    # FIXME: try/except clause only for backward compatibilty
+                    # for .ptyd files created priot to commit 2e626ff
+                    #try:
+                    #    source_frames = f.get('info/num_frames_actual')[...].item()
+                    #except TypeError:
+                    #    source_frames = len(f.get('info/positions_scan')[...])
+                if check:
+                    meta = io.h5read(self.source, 'meta')['meta']
+            except Exception as e:
+                # Failures are shared as well, such that the other
+                # processes don't wait for meta information forever
+                error = e
+        check, meta, failure = parallel.bcast(
+            (check, meta, None if error is None else repr(error)))
+
+        if error is not None:
+            raise error
+        if failure is not None:
+            raise IOError('Reading ptyd source %s failed on the master '
+                          'process: %s' % (source, failure))
+
+        if not check:
             raise IOError('Ptyd source %s contains no data. Load aborted'
                           % source)
 
@@ -1316,7 +1429,7 @@ class PtydScan(PtyScan):
         """
 
         # Get meta information
-        meta = u.Param(io.h5read(self.source, 'meta')['meta'])
+        meta = u.Param(meta)
 
         if meta.get('num_frames') is None:
             logger.warning('Ptyd source is not aware of the total'
@@ -1354,6 +1467,25 @@ class PtydScan(PtyScan):
         self._checked = {}
         self._ch_frame_ind = None
 
+        # Shapes of the chunks already inspected, {chunk: {key: shape}}
+        self._chunk_shapes = {}
+
+        # Frames read ahead in the background, as (indices, future)
+        self._prefetched = None
+        self._pool = None
+
+        # Read collectively through MPI-IO if h5py is built against a
+        # parallel HDF5 and all nodes take part in loading
+        self._collective = (parallel.MPIenabled and self.load_in_parallel
+                            and h5py.get_config().mpi)
+
+        # The reader is chosen once rather than on every load
+        if self._collective:
+            self._read = self._read_collective
+        else:
+            self._read = self._read_local
+        self._do_prefetch = self.info.prefetch and not self._collective
+
     def check(self, frames=None, start=None):
         """
         Implementation of the check routine for a .ptyd file format.
@@ -1369,38 +1501,267 @@ class PtydScan(PtyScan):
             frames = self.min_frames
 
         # Get info about size of currently available chunks.
-        # Dead external links will produce None and are excluded
-        with h5py.File(self.source, 'r') as f:
-            d = {}
-            ch_items = []
-            for k, v in f['chunks'].items():
+        # Dead external links will produce None and are excluded.
+        # Chunks are written once, so only those that are new since the
+        # last call need their (possibly external) link resolved.
+        # The source is closed again right away, so that a writer can
+        # keep appending to it.
+        shapes = self._chunk_shapes
+        with self._open_source() as f:
+            chunks = f['chunks']
+            for k in chunks.keys():
+                if int(k) in shapes:
+                    continue
+                v = chunks.get(k)
                 if v is not None:
-                    ch_items.append((int(k), v))
+                    shapes[int(k)] = dict((key, v[key].shape)
+                                          for key in v.keys())
 
-            ch_items = sorted(ch_items, key=lambda t: t[0])
+        ch_items = sorted(shapes.items())
 
-            for ch_key in ch_items[0][1].keys():
-                d[ch_key] = np.array([(int(k),) + v[ch_key].shape
-                                      for k, v in ch_items if v is not None])
-
-            f.close()
+        d = {}
+        for ch_key in ch_items[0][1].keys():
+            d[ch_key] = np.array([(k,) + v[ch_key] for k, v in ch_items])
 
         self._checked = d
-        all_frames = int(sum([ch[1] for ch in d['data']]))
-        ch_frame_ind = []
-        for dd in d['data']:
-            for frame in range(dd[1]):
-                ch_frame_ind.append((dd[0], frame))
 
-        self._ch_frame_ind = np.array(ch_frame_ind)
+        # (chunk, frame in chunk) for every frame, without a Python loop
+        counts = d['data'][:, 1]
+        all_frames = int(counts.sum())
+        starts = np.cumsum(counts) - counts
+        self._ch_frame_ind = np.stack(
+            [np.repeat(d['data'][:, 0], counts),
+             np.arange(all_frames) - np.repeat(starts, counts)], axis=1)
 
         # Accessible frames
         frames_accessible = min((frames, all_frames - start))
         # end_of_scan = source_frames <= start + frames_accessible
         return frames_accessible, None
 
-    def _coord_to_h5_calls(self, key, coord):
-        return 'chunks/%d/%s' % (coord[0], key), slice(coord[1], coord[1] + 1)
+    def _open_source(self):
+        """
+        Returns a new read-only handle to the source file. Callers close
+        it before returning, as a writing process may still append to the
+        source. The chunk cache is enlarged such that successive frame
+        reads from the same (compressed) chunk don't decompress it again.
+        """
+        return h5py.File(self.source, 'r', rdcc_nbytes=64 * 1024 * 1024,
+                         rdcc_nslots=100003)
+
+    def _finalize(self):
+        """
+        Stop reading ahead when End-of-Scan is reached.
+        """
+        super(PtydScan, self)._finalize()
+        self._prefetched = None
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    @staticmethod
+    def _frame_runs(coords):
+        """
+        Split chunk coordinates `coords` into runs of equally spaced
+        frames within the same chunk.
+
+        Returns
+        -------
+        runs : list
+            Tuples ``(chunk, sel, dest)`` where `sel` is a slice with a
+            constant step selecting the frames of `chunk`, and `dest`
+            the slice of the output they belong to.
+        """
+        runs = []
+        n = len(coords)
+        a = 0
+        while a < n:
+            ch, first = int(coords[a][0]), int(coords[a][1])
+            b = a + 1
+            if b < n and coords[b][0] == ch and coords[b][1] > first:
+                step = int(coords[b][1]) - first
+            else:
+                step = 1
+            while (b < n and coords[b][0] == ch
+                   and coords[b][1] - coords[b - 1][1] == step):
+                b += 1
+            last = first + step * (b - a - 1)
+            runs.append((ch, np.s_[first:last + 1:step], np.s_[a:b]))
+            a = b
+
+        return runs
+
+    def _read_frames(self, f, key, coords):
+        """
+        Read the frames of `key` at chunk coordinates `coords` into a
+        single preallocated array. Each run of equally spaced frames is
+        fetched with one ``read_direct`` call, i.e. a single hyperslab
+        selection, avoiding a temporary array per frame. Uncompressed
+        frame-wise chunks are copied in directly.
+        """
+        runs = self._frame_runs(coords)
+        if not runs:
+            return []
+
+        # Frames are stacked along the first axis, whatever the
+        # dimensionality of the dataset (1d for scalars, 2d for
+        # positions, 3d for data and weights)
+        dset = f['chunks/%d/%s' % (runs[0][0], key)]
+        out = np.empty((len(coords),) + dset.shape[1:],
+                       dtype=self._frame_dtype(key, dset))
+        for ch, sel, dest in runs:
+            dset = f['chunks/%d/%s' % (ch, key)]
+            if not self._whole_frame_chunks(dset, out.dtype):
+                dset.read_direct(out, sel, dest)
+                continue
+            # Each frame is one unfiltered chunk, copied in as raw bytes
+            zeros = (0,) * (dset.ndim - 1)
+            for i, frame in enumerate(range(sel.start, sel.stop, sel.step)):
+                buf = out[dest.start + i].reshape(-1).view(np.uint8)
+                dset.id.read_direct_chunk((frame,) + zeros, out=buf)
+
+        return out
+
+    @staticmethod
+    def _whole_frame_chunks(dset, dtype):
+        """
+        True if every frame of `dset` is stored as a single chunk that
+        passes no filter and needs no type conversion into `dtype`, so
+        that it may be read bypassing the HDF5 filter pipeline.
+        """
+        return (dset.ndim >= 2
+                and dset.chunks == (1,) + dset.shape[1:]
+                and dset.dtype == dtype
+                and dset.id.get_create_plist().get_nfilters() == 0)
+
+    def _frame_dtype(self, key, dset):
+        """
+        Data type in memory for dataset `dset` of field `key`. HDF5
+        converts from the stored type during ``read_direct``.
+        """
+        if key == 'data' and self.info.load_dtype is not None:
+            return np.dtype(self.info.load_dtype)
+        return dset.dtype
+
+    def _is_short(self, key):
+        """
+        True if the datasets of `key` lack rows for some of the frames
+        in a chunk, as e.g. empty weights do.
+        """
+        return np.any(self._checked[key][:, 1] < self._checked['data'][:, 1])
+
+    @staticmethod
+    def _read_rows(f, key, coords):
+        """
+        Read `key` row by row at chunk coordinates `coords`. Frames
+        beyond the end of a short dataset yield empty arrays.
+        """
+        return [np.squeeze(f['chunks/%d/%s' % (ch, key)][fr:fr + 1])
+                for ch, fr in coords]
+
+    def _read_all(self, f, coords):
+        """
+        Read the frames at chunk coordinates `coords` for all keys.
+        """
+        return dict((key, self._read_rows(f, key, coords)
+                     if self._is_short(key)
+                     else self._read_frames(f, key, coords))
+                    for key in self._checked.keys())
+
+    def _prefetch(self, indices):
+        """
+        Start reading the frames that the next call to :py:meth:`load`
+        is expected to ask for in a background thread. These are the
+        frames one chunk of scan points after `indices`, as long as they
+        are already available in the source.
+        """
+        if len(indices) == 0:
+            return
+        step = len(self.indices.chunk)
+        nxt = [i + step for i in indices]
+        if nxt[-1] >= len(self._ch_frame_ind):
+            return
+
+        if self._pool is None:
+            self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        coords = self._ch_frame_ind[nxt]
+        future = self._pool.submit(self._read_local, coords)
+        self._prefetched = (nxt, future)
+
+    def _read_local(self, coords):
+        """
+        Read the frames at chunk coordinates `coords` for all keys
+        through a handle to the source that is closed again afterwards.
+        Also used in the background by :py:meth:`_prefetch`.
+        """
+        with self._open_source() as f:
+            return self._read_all(f, coords)
+
+    def _read_collective(self, coords):
+        """
+        Read the frames at chunk coordinates `coords` for all keys
+        collectively through MPI-IO, passing the configured hints.
+        """
+        info = parallel.MPI.Info.Create()
+        for k, v in self.info.mpiio.items():
+            info.Set(k, str(v))
+        with h5py.File(self.source, 'r', driver='mpio',
+                       comm=parallel.comm, info=info) as f:
+            out = dict((key, self._read_rows(f, key, coords)
+                        if self._is_short(key)
+                        else self._read_frames_collective(f, key, coords))
+                       for key in self._checked.keys())
+        info.Free()
+        return out
+
+    def _read_frames_collective(self, f, key, coords):
+        """
+        Same as :py:meth:`_read_frames` but every node takes part in a
+        collective read of each chunk, such that MPI-IO can aggregate
+        the requests of all nodes into few large reads. Nodes without
+        frames in a chunk participate with empty selections.
+        """
+        chunks = [int(ch) for ch in self._checked[key][:, 0]]
+        runs = dict((ch, []) for ch in chunks)
+        for run in self._frame_runs(coords):
+            runs[run[0]].append(run[1:])
+
+        # Collective calls have to be matched across all nodes
+        nruns = np.array([len(runs[ch]) for ch in chunks], dtype=int)
+        parallel.allreduce(nruns, op=parallel.MPI.MAX)
+
+        # Chunks no node reads from are skipped by all nodes alike, so
+        # that only the datasets needed are opened
+        out = None
+        for ch, n in zip(chunks, nruns):
+            if n == 0:
+                continue
+            dset = f['chunks/%d/%s' % (ch, key)]
+            if out is None:
+                out = np.empty((len(coords),) + dset.shape[1:],
+                               dtype=self._frame_dtype(key, dset))
+            todo = runs[ch]
+            for r in range(n):
+                with dset.collective:
+                    if r < len(todo):
+                        sel, dest = todo[r]
+                        dset.read_direct(out, sel, dest)
+                    else:
+                        self._read_nothing(dset, out)
+
+        return [] if out is None else out
+
+    @staticmethod
+    def _read_nothing(dset, out):
+        """
+        Take part in a (collective) read of `dset` into `out` with empty
+        selections. ``read_direct`` skips the read for empty slices, which
+        would leave the other nodes waiting in a collective read.
+        """
+        fspace = dset.id.get_space()
+        fspace.select_none()
+        mspace = h5py.h5s.create_simple(out.shape)
+        mspace.select_none()
+        dset.id.read(mspace, fspace, out, dxpl=dset._dxpl)
 
     def load_weight(self):
         if 'weight2d' in self.info:
@@ -1418,25 +1779,29 @@ class PtydScan(PtyScan):
         Due to possible chunked data, slicing frames is non-trivial.
         """
         # Ok we need to communicate the some internal info
-        parallel.barrier()
         self._ch_frame_ind = parallel.bcast(self._ch_frame_ind)
-        parallel.barrier()
         self._checked = parallel.bcast_dict(self._checked)
 
         # Get the coordinates in the chunks
         coords = self._ch_frame_ind[indices]
-        calls = {}
-
-        for key in self._checked.keys():
-            calls[key] = [self._coord_to_h5_calls(key, c) for c in coords]
-
-        # Get our data from the ptyd file
-        out = {}
-        with h5py.File(self.source, 'r') as f:
-            for array, call in calls.items():
-                out[array] = [np.squeeze(f[path][slce]) for path, slce in call]
 
-            f.close()
+        # Get our data from the ptyd file, unless it was read ahead
+        out = None
+        if self._prefetched is not None:
+            pindices, future = self._prefetched
+            self._prefetched = None
+            if list(pindices) == list(indices):
+                out = future.result()
+            elif not future.cancel():
+                # A stale read ahead still has to finish, and its errors
+                # must not go unnoticed
+                future.result()
+
+        if out is None:
+            out = self._read(coords)
+
+        if self._do_prefetch:
+            self._prefetch(indices)
 
         # If the chunk provided indices, we use those instead of our own
         # Dangerous and not yet implemented
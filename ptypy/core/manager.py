@@ -283,6 +283,17 @@ class ScanModel(object):
         mask_views = []
         positions = []
 
+        # New views differ only in layer and active state, so all but
+        # the first are copied from the previous one (a template)
+        dv = None
+        mv = None
+
+        # Positions can only be missing if the scan did not provide them
+        # as a numeric array, so the per-frame check is mostly skipped
+        chunk_pos = dp['chunk'].get('positions') if 'chunk' in dp else None
+        check_pos = not (isinstance(chunk_pos, np.ndarray)
+                         and chunk_pos.dtype != object)
+
         # First pass: create or update views and reformat corresponding storage
         for dct in dp['iterable']:
 
@@ -291,14 +302,9 @@ class ScanModel(object):
 
             pos = dct.get('position')
 
-            if pos is None:
+            if check_pos and pos is None:
                 logger.warning('No position set to scan point %d of scan %s' % (index, label))
 
-            AR_diff.layer = index
-            AR_mask.layer = index
-            AR_diff.active = active
-            AR_mask.active = active
-
             # check here: is there already a view to this layer? Is it active?
             try:
                 old_view = old_diff_views[old_diff_layers.index(index)]
@@ -309,7 +315,13 @@ class ScanModel(object):
                     'Diff view with layer/index %s of scan %s exists. \nSetting view active state from %s to %s' % (
                         index, label, old_active, active))
             except ValueError:
-                v = View(self.Cdiff, accessrule=AR_diff)
+                if dv is None:
+                    dv = View(self.Cdiff, accessrule=AR_diff)
+                else:
+                    dv = dv.copy()
+                dv.layer = index
+                dv.active = active
+                v = dv
                 diff_views.append(v)
                 logger.debug(
                     'Diff view with layer/index %s of scan %s does not exist. \nCreating view with ID %s and set active state to %s' % (
@@ -321,8 +333,13 @@ class ScanModel(object):
                 old_view = old_mask_views[old_mask_layers.index(index)]
                 old_view.active = active
             except ValueError:
-                v = View(self.Cmask, accessrule=AR_mask)
-                mask_views.append(v)
+                if mv is None:
+                    mv = View(self.Cmask, accessrule=AR_mask)
+                else:
+                    mv = mv.copy()
+                mv.layer = index
+                mv.active = active
+                mask_views.append(mv)
 
         # so now we should have the right views to this storages. Let them reformat()
         # that will create the right sizes and the datalist access
@@ -332,7 +349,13 @@ class ScanModel(object):
         logger.info('Inserting data in diff and mask storages')
 
         # Second pass: copy the data 
-        # Benchmark: scales quadratic (!!) with number of frames per node.
+        # Buffers and layer maps are fixed after reformat(), so they are
+        # bound once and the layer positions are looked up in a dict
+        # rather than searched per frame, which scaled quadratically.
+        diff_buf = self.diff.data
+        mask_buf = self.mask.data
+        diff_layers = dict((l, k) for k, l in enumerate(self.diff.layermap))
+        mask_layers = dict((l, k) for k, l in enumerate(self.mask.layermap))
         for dct in dp['iterable']:
             if dct['data'] is None:
                 continue
@@ -340,8 +363,8 @@ class ScanModel(object):
             idx = dct['index']
 
             # FIXME: Find a more transparent way than this.
-            self.diff.data[self.diff.layermap.index(idx)][:] = diff_data
-            self.mask.data[self.mask.layermap.index(idx)][:] = dct.get('mask', np.ones_like(diff_data))
+            diff_buf[diff_layers[idx]][:] = diff_data
+            mask_buf[mask_layers[idx]][:] = dct.get('mask', True)
 
         # Update maximum nr. of frames in a block
         self.max_frames_per_block = self.diff.nlayers
@@ -578,6 +601,9 @@ class BlockScanModel(ScanModel):
         data = chunk['data']
         weights = chunk['weights']
 
+        # Storage layer of each index of this node, looked up per frame
+        dlayers = dict((index, l) for l, index in enumerate(indices_node))
+
         # First pass: create or update views and reformat corresponding storage
         for index in chunk['indices']:
 
@@ -600,11 +626,11 @@ class BlockScanModel(ScanModel):
             mask_views.append(mv)
 
             if active:
-                l = indices_node.index(index)
+                l = dlayers[index]
                 dv.dlayer = l
                 mv.dlayer = l
                 dv.data[:] = maybe_data
-                mv.data[:] = weights.get(index, np.ones_like(maybe_data))
+                mv.data[:] = weights.get(index, 1)
 
                 # positions
         positions = chunk.positions
@@ -700,6 +726,10 @@ class _Vanilla(object):
         ov = None
         ndim = self.Cdiff.ndim
 
+        # Probe and exit views sit at the origin. Setting an array
+        # coordinate is a plain copy, so it is built once for all views.
+        origin = u.expectN(0.0, ndim)
+
         # Loop through diffraction patterns
         for i in range(len(self.new_diff_views)):
             dv, mv = self.new_diff_views.pop(0), self.new_mask_views.pop(0)
@@ -710,13 +740,13 @@ class _Vanilla(object):
                 pv = View(container=self.ptycho.probe,
                       accessrule={'shape': self.probe_shape,
                                   'psize': geometry.resolution,
-                                  'coord': u.expectN(0.0, ndim),
+                                  'coord': origin,
                                   'storageID': ID,
                                   'layer': 0,
                                   'active': True})
             else:
                 pv = pv.copy(update=False)
-                pv.coord = 0.0
+                pv.coord = origin
 
             # if True:
             if ov is None:
@@ -736,7 +766,7 @@ class _Vanilla(object):
                 ev = View(container=self.ptycho.exit,
                       accessrule={'shape': self.exit_shape,
                                   'psize': geometry.resolution,
-                                  'coord': u.expectN(0.0, ndim),
+                                  'coord': origin,
                                   'storageID': dv.storageID,
                                   'layer': dv.layer,
                                   'active': dv.active})
@@ -745,7 +775,7 @@ class _Vanilla(object):
                 ev.storageID = dv.storageID
                 ev.layer = dv.layer
                 ev.active = dv.active
-                ev.coord = 0.0
+                ev.coord = origin
 
             views = {'probe': pv,
                      'obj': ov,
@@ -954,6 +984,11 @@ class _Full(object):
         object_id = 'S' + self.label
         probe_id = 'S' + self.label
 
+        # Probe position is the same for all views, and so is the object
+        # position if the object is empty
+        pos_pr = u.expect2(0.0)
+        empty = 'empty' in self.p.tags
+
         # Loop through diffraction patterns
         for i in range(len(self.new_diff_views)):
             dv, mv = self.new_diff_views.pop(0), self.new_mask_views.pop(0)
@@ -964,9 +999,8 @@ class _Full(object):
             else:
                 index = dv.layer
 
-            # Object and probe position
-            pos_pr = u.expect2(0.0)
-            pos_obj = self.new_positions[i] if 'empty' not in self.p.tags else 0.0
+            # Object position
+            pos_obj = pos_pr if empty else self.new_positions[i]
 
             # For multiwavelength reconstructions: loop here over
             # geometries, and modify probe_id and object_id.
@@ -1476,11 +1510,15 @@ class Bragg3dModel(Vanilla):
                     # q3) order. Also assume the images came in as (-q1, q2)
                     # from PtyScan. We want (q3, q1, q2) as required by
                     # Geo_Bragg, so flip the q1 dimension.
-                    order = [i[0] for i in sorted(enumerate(dct['angles']), key=lambda x: x[1])]
-                    dct['frames'] = [dct['frames'][i][::-1, :] for i in order]
-                    dct['masks'] = [dct['masks'][i][::-1, :] for i in order]
-                    diffdata = np.array(dct['frames'], dtype=self.ptycho.FType)
-                    maskdata = np.array(dct['masks'], dtype=bool)
+                    # The frames are copied straight into preallocated
+                    # stacks rather than through intermediate lists.
+                    order = np.argsort(dct['angles'], kind='stable')
+                    sh = (len(order),) + dct['frames'][0].shape
+                    diffdata = np.empty(sh, dtype=self.ptycho.FType)
+                    maskdata = np.empty(sh, dtype=bool)
+                    for k, i in enumerate(order):
+                        diffdata[k] = dct['frames'][i][::-1, :]
+                        maskdata[k] = dct['masks'][i][::-1, :]
                 else:
                     # this buffer belongs to another node
                     diffdata = None
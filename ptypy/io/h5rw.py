@@ -108,7 +108,17 @@ def _h5write(filename, mode, *args, **kwargs):
     # @sdebug
     def _store_numpy(group, a, name, compress=True):
         if compress:
-            dset = group.create_dataset(name, data=a, compression='gzip')
+            # Stacks of frames are chunked frame by frame, such that
+            # reading a single frame touches a single chunk. Large slices
+            # (e.g. of volumes) are left to h5py's chunk guess.
+            nbytes = a.itemsize * int(np.prod(a.shape[1:]))
+            if (a.ndim >= 3 and a.shape[0] > 0
+                    and 4096 <= nbytes <= 4 * 1024 * 1024):
+                chunks = (1,) + a.shape[1:]
+            else:
+                chunks = True
+            dset = group.create_dataset(name, data=a, compression='gzip',
+                                        chunks=chunks)
         else:
             dset = group.create_dataset(name, data=a)
         dset.attrs['type'] = 'array'
@@ -27,7 +27,7 @@ master = (rank == 0)
 
 __all__ = ['MPIenabled', 'comm', 'MPI', 'master','barrier',
            'LoadManager', 'loadmanager','allreduce','send','receive','bcast',
-           'bcast_dict', 'gather_dict', 'gather_list', 
+           'bcast_dict', 'gather_dict', 'gather_array', 'gather_list', 
            'MPIrand_normal', 'MPIrand_uniform','MPInoise2d']
 
 
@@ -589,6 +589,73 @@ def gather_dict(dct, target=0):
     #     barrier()
     # return out
 
+def gather_array(a, target=0):
+    """
+    Gathers the arrays `a` of all processes at rank `target`, stacked
+    along the first axis in the order of the ranks.
+
+    Unlike :py:func:`gather_dict`, the data is not pickled but transferred
+    with a single ``comm.Gatherv`` directly into the output array.
+
+    Parameters
+    ----------
+    a : ndarray
+        Input array with at least one dimension. All processes must
+        provide the same dtype and trailing shape, except for those with
+        an empty first axis, or a ValueError is raised. Remains unaltered
+    target : int
+        Rank of process where the arrays are gathered
+
+    Returns
+    -------
+    out : ndarray
+        Stacked array at ``rank==target``, None at ``rank!=target``
+
+    See also
+    --------
+    gather_dict
+    """
+    a = np.ascontiguousarray(a)
+    if not MPIenabled:
+        return a
+
+    # Processes without data may not know the dtype and trailing shape
+    info = comm.allgather((a.shape, a.dtype.str))
+    ref = [i for i in info if i[0][0] > 0]
+    sh, dtypestr = ref[0] if ref else info[target]
+    sh = tuple(sh[1:])
+
+    # Checked on all processes alike, such that all of them raise
+    for r, (ish, idtype) in enumerate(info):
+        if ish[0] == 0:
+            continue
+        if tuple(ish[1:]) != sh:
+            raise ValueError('Trailing shape %s of rank %d does not match %s'
+                             % (str(tuple(ish[1:])), r, str(sh)))
+        if idtype != dtypestr:
+            raise ValueError('Data type %s of rank %d does not match %s'
+                             % (idtype, r, dtypestr))
+    if a.shape[0] == 0:
+        a = np.empty((0,) + sh, dtype=dtypestr)
+
+    # Transfer rows of raw bytes. Counting rows rather than elements
+    # keeps the counts small and avoids issues with booleans
+    rows = [i[0][0] for i in info]
+    rowtype = MPI.BYTE.Create_contiguous(a.dtype.itemsize * int(np.prod(sh, dtype=int)))
+    rowtype.Commit()
+    sendbuf = [a.reshape(-1).view(np.uint8), rows[rank], rowtype]
+    if rank == target:
+        out = np.empty((sum(rows),) + sh, dtype=dtypestr)
+        displs = [0] + list(np.cumsum(rows[:-1]))
+        recvbuf = [out.reshape(-1).view(np.uint8), rows, displs, rowtype]
+    else:
+        out = None
+        recvbuf = None
+    comm.Gatherv(sendbuf, recvbuf, root=target)
+    rowtype.Free()
+
+    return out
+
 def _send(data, dest=0, tag=0):
     """
     Wrapper for comm.Send
@@ -821,17 +888,19 @@ def gather_list(lst, length, indices):
         if index < length:
             new[index] = item
     if MPIenabled:
-        for i in range(length):
-            if master:
-                # Root receives the data if it doesn't have it yet
-                if new[i] is None:
-                    new[i] = receive()
-                barrier()
-            else:
-                if new[i] is not None:
-                    # Send data to root.
-                    send(new[i])
-                barrier()
+        # Root learns once which items each process holds and then
+        # receives them rank by rank, which keeps them in order without
+        # a barrier per item.
+        held = [i for i in range(length) if new[i] is not None]
+        owners = comm.gather([] if master else held, root=0)
+        if master:
+            for r, items in enumerate(owners):
+                for i in items:
+                    new[i] = receive(r)
+        else:
+            for i in held:
+                # Send data to root.
+                send(new[i])
         barrier()
 
     return new
@@ -103,6 +103,29 @@ class H5rwStoreTest(unittest.TestCase):
         except:
             self.fail(msg="Couldn't store a array type")
 
+    def test_store_frame_stack_chunked_per_frame(self):
+        data = np.ones((5, 32, 32))
+        path = self.filepath % "store_frame_stack_test"
+        io.h5write(path, content={'frames': data})
+        with h5.File(path, 'r') as f:
+            self.assertEqual(f['content/frames'].chunks, (1, 32, 32))
+        np.testing.assert_array_equal(io.h5read(path)['content']['frames'], data)
+
+    def test_store_large_slices_not_chunked_per_slice(self):
+        data = np.zeros((2, 1024, 1024))
+        path = self.filepath % "store_large_slices_test"
+        io.h5write(path, content={'volume': data})
+        with h5.File(path, 'r') as f:
+            chunks = f['content/volume'].chunks
+            self.assertLess(np.prod(chunks) * data.itemsize, data[0].nbytes)
+
+    def test_store_empty_frame_stack(self):
+        data = np.zeros((0, 64, 64))
+        path = self.filepath % "store_empty_frame_stack_test"
+        io.h5write(path, content={'frames': data})
+        with h5.File(path, 'r') as f:
+            self.assertEqual(f['content/frames'].shape, data.shape)
+
     def test_store_numpy_record_array(self):
         data = np.recarray((8,), dtype=[('ID','<U16')])
 
@@ -3,6 +3,8 @@ This script creates a sample *.ptyd data file using the built-in
 test Scan `ptypy.core.data.MoonFlowerScan`
 """
 import ptypy
+import numpy as np
+import h5py
 from ptypy import utils as u
 import tempfile
 import shutil
@@ -63,6 +65,17 @@ class OnTheFlyPtydTest(unittest.TestCase):
 
         return ptypy.core.data.PtydScan(data, source=dfile)
 
+    def _write_source(self):
+        # Writes all frames to the source in two chunks and returns them
+        # as {index: frame} on the master, None elsewhere
+        source = None
+        if u.parallel.master:
+            source = {}
+            for m in [self.S1.auto(30), self.S1.auto(100)]:
+                source.update(m['chunk'].data)
+        u.parallel.barrier()
+        return source
+
     def test_non_existing_chunk(self):
         try:
             S2 = self._create_PtydScan(save=None)
@@ -108,6 +121,132 @@ class OnTheFlyPtydTest(unittest.TestCase):
         self.assertEqual(50, len(msg['iterable']),
                          'There should be 20 frames available in Source ptyd')
 
+    def test_load_across_chunks(self):
+        source = self._write_source()
+        S2 = self._create_PtydScan(save=None)
+        S2.initialize()
+        msg = S2.auto(100)
+        if u.parallel.master:
+            for frame in msg['iterable']:
+                if frame['data'] is None:
+                    continue
+                np.testing.assert_array_equal(frame['data'],
+                                              source[frame['index']])
+
+    def test_load_with_prefetch(self):
+        source = self._write_source()
+        S2 = self._create_PtydScan(save=None, prefetch=True)
+        S2.initialize()
+        loaded = [S2.auto(10) for i in range(5)]
+        if u.parallel.master:
+            for msg in loaded:
+                self.assertEqual(10, len(msg['iterable']))
+                for frame in msg['iterable']:
+                    np.testing.assert_array_equal(frame['data'],
+                                                  source[frame['index']])
+
+    def test_load_strided_indices(self):
+        source = self._write_source()
+        S2 = self._create_PtydScan(save=None)
+        S2.initialize()
+        S2.check(100, 0)
+        indices = [0, 2, 4, 6, 7, 31, 34, 37]
+        data, positions, weights = S2.load(indices)
+        if u.parallel.master:
+            self.assertEqual(sorted(data.keys()), indices)
+            for k in indices:
+                np.testing.assert_array_equal(data[k], source[k])
+
+    def test_load_dtype(self):
+        source = self._write_source()
+        S2 = self._create_PtydScan(save=None, load_dtype='float32')
+        S2.initialize()
+        S2.check(100, 0)
+        data, positions, weights = S2.load(list(range(25, 35)))
+        if u.parallel.master:
+            for k, frame in data.items():
+                self.assertEqual(frame.dtype, np.float32)
+                np.testing.assert_allclose(frame, source[k], rtol=1e-6)
+
+    def test_load_uncompressed_frame_chunks(self):
+        raw = TEMPDIR + '/raw.ptyd'
+        source = self._write_source()
+        if u.parallel.master:
+            # Copy the source without compression, one chunk per frame
+            with h5py.File(self.DATA.dfile, 'r') as f, h5py.File(raw, 'w') as g:
+                f.copy('meta', g)
+                for ch, grp in f['chunks'].items():
+                    for k, v in grp.items():
+                        chunks = (1,) + v.shape[1:] if v.ndim == 3 else None
+                        g.create_dataset('chunks/%s/%s' % (ch, k),
+                                         data=v[...], chunks=chunks)
+        u.parallel.barrier()
+        S2 = ptypy.core.data.PtydScan(u.Param(save=None), source=raw)
+        S2.initialize()
+        S2.check(100, 0)
+        indices = [0, 2, 4, 6, 7, 31, 34, 37]
+        data, positions, weights = S2.load(indices)
+        if u.parallel.master:
+            for k in indices:
+                np.testing.assert_array_equal(data[k], source[k])
+
+    def test_load_empty_weights(self):
+        # Chunks may hold fewer weights than frames, e.g. none at all
+        source = self._write_source()
+        if u.parallel.master:
+            with h5py.File(self.DATA.dfile, 'r') as f:
+                parts = [f['chunks'].get(ch, getlink=True).filename
+                         for ch in f['chunks']]
+            for part in parts:
+                with h5py.File(part, 'r+') as g:
+                    del g['weights']
+                    g['weights'] = np.zeros((0,))
+        u.parallel.barrier()
+        S2 = self._create_PtydScan(save=None)
+        S2.initialize()
+        S2.check(100, 0)
+        indices = [0, 2, 4, 6, 7, 31, 34, 37]
+        data, positions, weights = S2.load(indices)
+        if u.parallel.master:
+            for k in indices:
+                np.testing.assert_array_equal(data[k], source[k])
+                self.assertEqual(weights[k].size, 0)
+
+    def test_interleaved_write_and_read(self):
+        # The writer keeps appending to the source that is being read,
+        # which fails if the reader keeps the file open between calls
+        data = self.DATA.copy()
+        data.dfile = TEMPDIR + '/appended.ptyd'
+        data.save = 'append'
+        if u.parallel.master:
+            S1 = ptypy.core.data.MoonFlowerScan(data)
+            S1.initialize()
+            source = dict(S1.auto(10)['chunk'].data)
+        u.parallel.barrier()
+        S2 = ptypy.core.data.PtydScan(u.Param(save=None), source=data.dfile)
+        S2.initialize()
+        for i in range(4):
+            msg = S2.auto(10)
+            self.assertEqual(10, len(msg['iterable']))
+            if u.parallel.master:
+                for frame in msg['iterable']:
+                    np.testing.assert_array_equal(frame['data'],
+                                                  source[frame['index']])
+                source.update(S1.auto(10)['chunk'].data)
+            u.parallel.barrier()
+
+    def test_read_nothing(self):
+        # Nodes without frames join collective reads with empty selections
+        if not u.parallel.master:
+            return
+        path = TEMPDIR + '/nothing.h5'
+        with h5py.File(path, 'w') as f:
+            f['frames'] = np.arange(24.).reshape(2, 3, 4)
+            for n in [0, 2]:
+                out = np.full((n, 3, 4), -1.)
+                ptypy.core.data.PtydScan._read_nothing(f['frames'], out)
+                self.assertTrue((out == -1.).all())
+
     def test_check(self):
         if u.parallel.master: msg = self.S1.auto(30)
         u.parallel.barrier()
@@ -2,17 +2,24 @@ from ptypy.core import Ptycho
 from ptypy import utils as u
 from test import utils as tu
 import tempfile
+import shutil
 import unittest
 
 class PrepAndRunMoonFlowerTest(unittest.TestCase):
 
+    def setUp(self):
+        self.outpath = tempfile.mkdtemp(suffix="PrepAndRunMoonFlower_test")
+
+    def tearDown(self):
+        shutil.rmtree(self.outpath)
+
     def test_dm_single_probe(self):
         p = u.Param()
         p.verbose_level = 3
         p.io = u.Param()
         p.io.interaction = u.Param()
         p.io.interaction.active = False
-        p.io.home = "./"
+        p.io.home = self.outpath
         p.io.rfile = "None.ptyr"
         p.io.autosave = u.Param(active=False)
         p.io.autoplot = u.Param(active=False)
@@ -40,7 +47,7 @@ class PrepAndRunMoonFlowerTest(unittest.TestCase):
         p.io = u.Param()
         p.io.interaction = u.Param()
         p.io.interaction.active = False
-        p.io.home = "./"
+        p.io.home = self.outpath
         p.io.rfile = "None.ptyr"
         p.io.autosave = u.Param(active=False)
         p.io.autoplot = u.Param(active=False)
@@ -73,7 +80,7 @@ class PrepAndRunMoonFlowerTest(unittest.TestCase):
         p.io = u.Param()
         p.io.interaction = u.Param()
         p.io.interaction.active = False
-        p.io.home = "./"
+        p.io.home = self.outpath
         p.io.rfile = "None.ptyr"
         p.io.autosave = u.Param(active=False)
         p.io.autoplot = u.Param(active=False)
@@ -102,7 +109,7 @@ class PrepAndRunMoonFlowerTest(unittest.TestCase):
         p.io = u.Param()
         p.io.interaction = u.Param()
         p.io.interaction.active = False
-        p.io.home = "./"
+        p.io.home = self.outpath
         p.io.rfile = "None.ptyr"
         p.io.autosave = u.Param(active=False)
         p.io.autoplot = u.Param(active=False)
@@ -138,7 +145,7 @@ class PrepAndRunMoonFlowerTest(unittest.TestCase):
         p.io = u.Param()
         p.io.interaction = u.Param()
         p.io.interaction.active = False
-        p.io.home = "./"
+        p.io.home = self.outpath
         p.io.rfile = "None.ptyr"
         p.io.autosave = u.Param(active=False)
         p.io.autoplot = u.Param(active=False)